@@ -1,8 +1,12 @@
 import os
+import functools
+import numpy as np
 import pandas as pd
 from flask import Flask, render_template_string, request
+from flask_compress import Compress
 import plotly.graph_objects as go
 import plotly.io as pio
+from plotly.offline import get_plotlyjs_version
 from datetime import datetime
 
 # ==============================================================================
@@ -10,45 +14,97 @@ from datetime import datetime
 # ==============================================================================
 EURO_COUNTRIES = {'DE': 'Germany', 'IT': 'Italy', 'FR': 'France'}
 EURO_PLOT_ORDER = ['Up to 1Y', '1Y-2Y', '2Y-5Y', '5Y-10Y', '10Y+']
+EURO_CACHE_FILE = 'euro_data.parquet'
 EURO_PLOTLY_COLORS = {'Up to 1Y': '#3288bd', '1Y-2Y': '#abdda4', '2Y-5Y': '#fdae61', '5Y-10Y': '#f46d43', '10Y+': '#d53e4f'}
-US_AUCTION_CACHE_FILE = 'auctions.pkl'
+US_AUCTION_CACHE_FILE = 'auctions.parquet'
+US_CACHE_COLUMNS = ['issue_date', 'auction_date', 'security_term', 'offering_amt']
+US_QUARTERLY_CACHE_FILE = 'auctions_quarterly.parquet'
 US_PLOT_ORDER = ['< 1 Month','1-3 Months','3-12 Months','1-3 Years','3-10 Years','10+ Years','Other']
 US_PLOTLY_COLORS = {'< 1 Month':'#d53e4f', '1-3 Months':'#f46d43', '3-12 Months':'#fdae61', '1-3 Years':'#abdda4', '3-10 Years':'#3288bd', '10+ Years':'#5e4fa2', 'Other':'#cccccc'}
+pio.templates['debt_dashboard'] = go.layout.Template(layout=dict(
+    height=700, margin=dict(b=40), hovermode='x unified',
+    xaxis=dict(showgrid=True, gridwidth=1, gridcolor='LightGrey', griddash='dash'),
+    yaxis=dict(showgrid=True, gridwidth=1, gridcolor='LightGrey', griddash='dash'),
+    shapedefaults=dict(type="line", xref="x", yref="paper", y0=0, y1=1, line=dict(color="grey", width=1, dash="dash"), opacity=0.5)))
+pio.templates.default = 'plotly+debt_dashboard'
+PLOTLY_JS_URL = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
 
 # ==============================================================================
 # --- PLOTTING LOGIC ---
 # ==============================================================================
+@functools.lru_cache(maxsize=32)
+def _build_shapes(dates, unit):
+    return tuple(dict(x0=date, x1=date) for date in pd.DatetimeIndex(np.array(dates, dtype=f'datetime64[{unit}]')))
+
 def create_euro_plotly_charts(df, country_name):
-    if df is None or df.empty: return "<p>No data to display.</p>", "<p>No data to display.</p>"
-    monthly_total = df.sum(axis=1)
-    df_positive = df[monthly_total > 0].copy()
-    if df_positive.empty: return "<p>No positive issuance data to plot.</p>", "<p>No positive issuance data to plot.</p>"
-    shapes = [dict(type="line", xref="x", yref="paper", x0=date, y0=0, x1=date, y1=1, line=dict(color="grey", width=1, dash="dash"), opacity=0.5) for date in df_positive.index]
-    monthly_total_positive = df_positive.sum(axis=1)
-    df_pct = df_positive.div(monthly_total_positive, axis=0) * 100
+    if df is None or df.empty: return "", "", "<p>No data to display.</p>"
+    values = df.to_numpy(dtype='float64')
+    monthly_total = np.nansum(values, axis=1)
+    positive = monthly_total > 0
+    if not positive.any(): return "", "", "<p>No positive issuance data to plot.</p>"
+    dates = df.index[positive]
+    values, monthly_total = values[positive], monthly_total[positive]
+    shapes = _build_shapes(tuple(dates.asi8), dates.unit)
+    tenor_columns = [(cat, df.columns.get_loc(cat)) for cat in EURO_PLOT_ORDER if cat in df.columns]
+    pct = values / monthly_total[:, None] * 100
     fig_pct = go.Figure()
-    for cat in EURO_PLOT_ORDER:
-        if cat in df_pct.columns:
-            fig_pct.add_trace(go.Scatter(x=df_pct.index, y=df_pct[cat], name=cat, mode='lines', stackgroup='one', line=dict(color=EURO_PLOTLY_COLORS.get(cat)), hovertemplate=f'<b>{cat}</b><br>%{{x|%Y-%m-%d}}<br>%{{y:.2f}}%<extra></extra>'))
-    fig_pct.update_layout(title_text=f'<b>{country_name} Makeup of Gross Issues of Euro-Denominated Debt Securities by Central Government (Excluding Social Security, Monthly)</b><br><span style="font-size:6px;color:grey;">Data from: https://data.ecb.europa.eu/...</span>', yaxis_title="Issuance Mix (%)", legend_title_text='Tenor', height=700, margin=dict(b=40), shapes=shapes, hovermode='x unified')
-    df_billions = df_positive / 1000
+    for cat, j in tenor_columns:
+        fig_pct.add_trace(go.Scatter(x=dates, y=pct[:, j], name=cat, mode='lines', stackgroup='one', line=dict(color=EURO_PLOTLY_COLORS.get(cat)), hovertemplate=f'<b>{cat}</b><br>%{{x|%Y-%m-%d}}<br>%{{y:.2f}}%<extra></extra>'))
+    fig_pct.update_layout(title_text=f'<b>{country_name} Makeup of Gross Issues of Euro-Denominated Debt Securities by Central Government (Excluding Social Security, Monthly)</b><br><span style="font-size:6px;color:grey;">Data from: https://data.ecb.europa.eu/...</span>', yaxis_title="Issuance Mix (%)", legend_title_text='Tenor', shapes=shapes)
+    billions = values / 1000
     fig_nominal = go.Figure()
-    for cat in EURO_PLOT_ORDER:
-        if cat in df_billions.columns:
-            hovertemplate_string = '<b>' + cat + '</b><br>%{x|%Y-%m-%d}<br>€%{y:,.2f} Billion<extra></extra>'
-            fig_nominal.add_trace(go.Scatter(x=df_billions.index, y=df_billions[cat], name=cat, mode='lines', stackgroup='one', line=dict(color=EURO_PLOTLY_COLORS.get(cat)), hovertemplate=hovertemplate_string))
-    fig_nominal.update_layout(title_text=f'<b>{country_name} Nominal Gross Issues of Euro-Denominated Debt Securities by Central Government (Excluding Social Security, Monthly)</b><br><span style="font-size:6px;color:grey;">Data from: https://data.ecb.europa.eu/...</span>', yaxis_title="Issuance Amount (€ Billions)", legend_title_text='Tenor', height=700, margin=dict(b=40), shapes=shapes, hovermode='x unified')
-    for fig in [fig_pct, fig_nominal]:
-        fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='LightGrey', griddash='dash')
-        fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='LightGrey', griddash='dash')
-    return pio.to_html(fig_pct, full_html=False), pio.to_html(fig_nominal, full_html=False)
+    for cat, j in tenor_columns:
+        hovertemplate_string = '<b>' + cat + '</b><br>%{x|%Y-%m-%d}<br>€%{y:,.2f} Billion<extra></extra>'
+        fig_nominal.add_trace(go.Scatter(x=dates, y=billions[:, j], name=cat, mode='lines', stackgroup='one', line=dict(color=EURO_PLOTLY_COLORS.get(cat)), hovertemplate=hovertemplate_string))
+    fig_nominal.update_layout(title_text=f'<b>{country_name} Nominal Gross Issues of Euro-Denominated Debt Securities by Central Government (Excluding Social Security, Monthly)</b><br><span style="font-size:6px;color:grey;">Data from: https://data.ecb.europa.eu/...</span>', yaxis_title="Issuance Amount (€ Billions)", legend_title_text='Tenor', shapes=shapes)
+    return fig_pct.to_json(), fig_nominal.to_json(), ""
+
+@functools.lru_cache(maxsize=64)
+def _render_us(start_date, end_date, today):
+    today_pd = pd.Timestamp(today)
+    future_table_html = "<h2>Forthcoming Auctions</h2>"
+    future_start = np.searchsorted(US_AUCTION_DATES, today_pd.to_datetime64(), side='right')
+    df_future_display = US_DASHBOARD_DATA.iloc[future_start:][['auction_date', 'security_term', 'offering_amt']].dropna(subset=['auction_date']).reset_index(drop=True)
+    if not df_future_display.empty:
+        df_future_display['offering_amt'] = df_future_display['offering_amt'] / 1e9
+        df_future_display['auction_date'] = df_future_display['auction_date'].dt.strftime('%Y-%m-%d')
+        df_future_display.rename(columns={'auction_date': 'Auction Date', 'security_term': 'Security', 'offering_amt': 'Offering Amount'}, inplace=True)
+        future_table_html += df_future_display.to_html(classes='table', index=False, formatters={'Offering Amount': '${:,.2f}B'.format})
+    else:
+        future_table_html += "<p>No future auctions currently announced.</p>"
+    quarterly_mix_nominal = US_QUARTERLY_DATA.loc[pd.Timestamp(start_date) + pd.offsets.QuarterEnd(0):pd.Timestamp(end_date) + pd.offsets.QuarterEnd(0)]
+    chart_json, nominal_chart_json, chart_message = "", "", ""
+    if quarterly_mix_nominal.empty:
+        chart_message = "<p>No data for selected date range.</p>"
+    else:
+        quarterly_mix_pct = quarterly_mix_nominal.divide(quarterly_mix_nominal.sum(axis=1), axis=0).fillna(0) * 100
+        shapes = _build_shapes(tuple(quarterly_mix_pct.index.asi8), quarterly_mix_pct.index.unit)
+        fig_pct = go.Figure()
+        for cat in US_PLOT_ORDER:
+            fig_pct.add_trace(go.Scatter(x=quarterly_mix_pct.index, y=quarterly_mix_pct[cat], name=cat, mode='lines', stackgroup='one', line=dict(color=US_PLOTLY_COLORS.get(cat)), hovertemplate = f'<b>{cat} Share: </b>%{{y:.2f}}%<extra></extra>'))
+        fig_pct.update_layout(title_text='<b>Makeup of U.S. Treasury Securities Auction Results by Security Term</b><br><span style="font-size:9px;color:grey;">Data from: https://fiscaldata.treasury.gov/...</span>', legend_title_text='Maturity Bin', yaxis_title="Issuance Mix (%)", shapes=shapes, xaxis_range=[start_date, today])
+        fig_nominal = go.Figure()
+        for cat in US_PLOT_ORDER:
+            fig_nominal.add_trace(go.Scatter(x=quarterly_mix_nominal.index, y=quarterly_mix_nominal[cat] / 1e9, name=cat, mode='lines', stackgroup='one', line=dict(color=US_PLOTLY_COLORS.get(cat)), hovertemplate = '<b>' + cat + '</b><br>%{x|%Y-%m-%d}<br>$%{y:.2f} Billion<extra></extra>'))
+        fig_nominal.update_layout(title_text='<b>Nominal U.S. Treasury Securities Auction Results by Security Term</b><br><span style="font-size:9px;color:grey;">Data from: https://fiscaldata.treasury.gov/...</span>', legend_title_text='Maturity Bin', yaxis_title="Issuance Amount ($ Billions)", shapes=shapes, xaxis_range=[start_date, today])
+        chart_json = fig_pct.to_json()
+        nominal_chart_json = fig_nominal.to_json()
+    return chart_json, nominal_chart_json, chart_message, future_table_html
+
+@functools.lru_cache(maxsize=8)
+def _render_euro(country_code):
+    return create_euro_plotly_charts(EURO_DASHBOARD_DATA[country_code], EURO_COUNTRIES[country_code])
 
 # ==============================================================================
 # --- FLASK WEB APPLICATION ---
 # ==============================================================================
 app = Flask(__name__)
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 500
+Compress(app)
 HTML_TEMPLATE = """
 <!doctype html><html><head><title>Debt Issuance Dashboard</title>
+<script src="{{ plotly_js_url }}"></script>
 <style>
     body{font-family:sans-serif;margin:2em;background-color:#f4f4f9;color:#333;} h1{color:#003399;}
     .controls, .us-controls{display:flex;align-items:center;gap:15px;margin-bottom:1em;padding:1em;border:1px solid #ccc;border-radius:8px;background-color:#fff;}
@@ -75,80 +131,60 @@ HTML_TEMPLATE = """
     <label for="end">End:</label><input type="date" id="end" name="end_date" value="{{ end_date }}">
     <button type="submit">Update</button>
 </form></div>{% endif %}
-<div class="chart">{{ chart_html|safe }}</div>
-<div class="chart">{{ nominal_chart_html|safe }}</div>
+{% if chart_message %}<div class="chart">{{ chart_message|safe }}</div>
+<div class="chart">{{ chart_message|safe }}</div>
+{% elif chart_json %}<div class="chart" id="chart-pct"></div>
+<div class="chart" id="chart-nominal"></div>
+<script>
+    var pctFig = JSON.parse({{ chart_json|tojson }});
+    Plotly.newPlot('chart-pct', pctFig.data, pctFig.layout, {responsive: true});
+    var nominalFig = JSON.parse({{ nominal_chart_json|tojson }});
+    Plotly.newPlot('chart-nominal', nominalFig.data, nominalFig.layout, {responsive: true});
+</script>{% endif %}
 {% if selected_country == 'US' %}<div class="table-container">{{ future_table_html|safe }}</div>{% endif %}
 </body></html>
 """
 try:
-    US_DASHBOARD_DATA = pd.read_pickle(US_AUCTION_CACHE_FILE)
-    print(f"✅ Successfully loaded US data from cache file: {US_AUCTION_CACHE_FILE}")
+    US_DASHBOARD_DATA = pd.read_parquet(US_AUCTION_CACHE_FILE, engine='pyarrow', columns=US_CACHE_COLUMNS)
+    US_QUARTERLY_DATA = pd.read_parquet(US_QUARTERLY_CACHE_FILE, engine='pyarrow')
+    US_AUCTION_DATES = US_DASHBOARD_DATA['auction_date'].to_numpy()
+    US_DEFAULT_START_DATE = US_DASHBOARD_DATA['issue_date'].min().strftime('%Y-%m-%d')
+    print(f"✅ Successfully loaded US data from cache files: {US_AUCTION_CACHE_FILE}, {US_QUARTERLY_CACHE_FILE}")
 except FileNotFoundError:
     print(f"⚠️ WARNING: US cache file not found. US charts will be empty until the update script is run.")
     US_DASHBOARD_DATA = pd.DataFrame()
+    US_QUARTERLY_DATA = pd.DataFrame()
+    US_AUCTION_DATES = np.array([], dtype='datetime64[ns]')
+    US_DEFAULT_START_DATE = ""
+try:
+    EURO_DASHBOARD_DATA = {code: group.drop(columns='country').dropna(axis=1, how='all') for code, group in pd.read_parquet(EURO_CACHE_FILE, engine='pyarrow').groupby('country')}
+    print(f"✅ Successfully loaded EURO data from cache file: {EURO_CACHE_FILE}")
+except FileNotFoundError:
+    print(f"⚠️ WARNING: EURO cache file not found. Euro charts will be empty until the update script is run.")
+    EURO_DASHBOARD_DATA = {}
 @app.route('/', methods=['GET'])
 def dashboard():
     selected_country_code = request.args.get('country', 'US')
-    chart_html, nominal_chart_html, future_table_html = "", "", ""
+    chart_json, nominal_chart_json, chart_message, future_table_html = "", "", "", ""
     start_date, end_date = "", ""
     title = "Debt Issuance Dashboard"
     if selected_country_code == 'US':
         title = "U.S. Treasury Debt Issuance Dashboard"
         if US_DASHBOARD_DATA.empty:
-             chart_html = nominal_chart_html = "<p>US data cache is empty. Please run the update script.</p>"
+             chart_message = "<p>US data cache is empty. Please run the update script.</p>"
         else:
             today_dt = datetime.now()
-            today_pd = pd.to_datetime('today').normalize()
-            default_start = US_DASHBOARD_DATA['issue_date'].min().strftime('%Y-%m-%d')
-            start_date = request.args.get('start_date', default_start)
+            start_date = request.args.get('start_date', US_DEFAULT_START_DATE)
             end_date = request.args.get('end_date', today_dt.strftime('%Y-%m-%d'))
-            future_table_html = "<h2>Forthcoming Auctions</h2>"
-            df_future = US_DASHBOARD_DATA[US_DASHBOARD_DATA['auction_date'] > today_pd].copy()
-            if not df_future.empty:
-                df_future_display = df_future[['auction_date', 'security_term', 'offering_amt']].sort_values('auction_date').reset_index(drop=True)
-                df_future_display['offering_amt'] = (df_future_display['offering_amt'] / 1e9).map('${:,.2f}B'.format)
-                df_future_display['auction_date'] = df_future_display['auction_date'].dt.strftime('%Y-%m-%d')
-                df_future_display.rename(columns={'auction_date': 'Auction Date', 'security_term': 'Security', 'offering_amt': 'Offering Amount'}, inplace=True)
-                future_table_html += df_future_display.to_html(classes='table', index=False)
-            else:
-                future_table_html += "<p>No future auctions currently announced.</p>"
-            mask = (US_DASHBOARD_DATA['issue_date'] >= start_date) & (US_DASHBOARD_DATA['issue_date'] <= end_date)
-            df_filtered = US_DASHBOARD_DATA.loc[mask].copy()
-            if df_filtered.empty:
-                chart_html = nominal_chart_html = "<p>No data for selected date range.</p>"
-            else:
-                df_filtered.set_index('issue_date', inplace=True)
-                quarterly_issuance = df_filtered.resample('Q')['total_accepted'].sum()
-                quarterly_mix_nominal = df_filtered.groupby([pd.Grouper(freq='Q'), 'maturity_bin'])['total_accepted'].sum().unstack(fill_value=0)
-                quarterly_mix_pct = quarterly_mix_nominal.divide(quarterly_issuance, axis=0).fillna(0) * 100
-                shapes = [dict(type="line", xref="x", yref="paper", x0=q_date, y0=0, x1=q_date, y1=1, line=dict(color="grey", width=1, dash="dash"), opacity=0.5) for q_date in quarterly_mix_pct.index]
-                fig_pct = go.Figure()
-                for cat in US_PLOT_ORDER:
-                    if cat in quarterly_mix_pct.columns:
-                        fig_pct.add_trace(go.Scatter(x=quarterly_mix_pct.index, y=quarterly_mix_pct[cat], name=cat, mode='lines', stackgroup='one', line=dict(color=US_PLOTLY_COLORS.get(cat)), hovertemplate = f'<b>{cat} Share: </b>%{{y:.2f}}%<extra></extra>'))
-                fig_pct.update_layout(title_text='<b>Makeup of U.S. Treasury Securities Auction Results by Security Term</b><br><span style="font-size:9px;color:grey;">Data from: https://fiscaldata.treasury.gov/...</span>', legend_title_text='Maturity Bin', yaxis_title="Issuance Mix (%)", height=700, margin=dict(b=40), shapes=shapes, xaxis_range=[start_date, today_dt], hovermode='x unified')
-                fig_nominal = go.Figure()
-                for cat in US_PLOT_ORDER:
-                     if cat in quarterly_mix_nominal.columns:
-                        fig_nominal.add_trace(go.Scatter(x=quarterly_mix_nominal.index, y=quarterly_mix_nominal[cat] / 1e9, name=cat, mode='lines', stackgroup='one', line=dict(color=US_PLOTLY_COLORS.get(cat)), hovertemplate = '<b>' + cat + '</b><br>%{x|%Y-%m-%d}<br>$%{y:.2f} Billion<extra></extra>'))
-                fig_nominal.update_layout(title_text='<b>Nominal U.S. Treasury Securities Auction Results by Security Term</b><br><span style="font-size:9px;color:grey;">Data from: https://fiscaldata.treasury.gov/...</span>', legend_title_text='Maturity Bin', yaxis_title="Issuance Amount ($ Billions)", height=700, margin=dict(b=40), shapes=shapes, xaxis_range=[start_date, today_dt], hovermode='x unified')
-                for fig in [fig_pct, fig_nominal]:
-                    fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='LightGrey', griddash='dash')
-                    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='LightGrey', griddash='dash')
-                chart_html = pio.to_html(fig_pct, full_html=False)
-                nominal_chart_html = pio.to_html(fig_nominal, full_html=False)
+            chart_json, nominal_chart_json, chart_message, future_table_html = _render_us(start_date, end_date, today_dt.strftime('%Y-%m-%d'))
     
     elif selected_country_code in EURO_COUNTRIES:
         title = f"{EURO_COUNTRIES[selected_country_code]} Debt Issuance Dashboard"
-        try:
-            euro_cache_file = f'euro_data_{selected_country_code}.pkl'
-            monthly_summary_df = pd.read_pickle(euro_cache_file)
-            print(f"✅ Successfully loaded EURO data from cache file: {euro_cache_file}")
-            chart_html, nominal_chart_html = create_euro_plotly_charts(monthly_summary_df, EURO_COUNTRIES[selected_country_code])
-        except FileNotFoundError:
-            print(f"⚠️ WARNING: EURO cache file for {selected_country_code} not found. Charts will be empty until the update script is run.")
-            chart_html = nominal_chart_html = f"<p>Euro data cache for {EURO_COUNTRIES[selected_country_code]} is empty. Please run the update script.</p>"
-    return render_template_string(HTML_TEMPLATE, title=title, chart_html=chart_html, nominal_chart_html=nominal_chart_html, future_table_html=future_table_html, selected_country=selected_country_code, start_date=start_date, end_date=end_date)
+        if selected_country_code in EURO_DASHBOARD_DATA:
+            chart_json, nominal_chart_json, chart_message = _render_euro(selected_country_code)
+        else:
+            chart_message = f"<p>Euro data cache for {EURO_COUNTRIES[selected_country_code]} is empty. Please run the update script.</p>"
+    return render_template_string(HTML_TEMPLATE, title=title, plotly_js_url=PLOTLY_JS_URL, chart_json=chart_json, nominal_chart_json=nominal_chart_json, chart_message=chart_message, future_table_html=future_table_html, selected_country=selected_country_code, start_date=start_date, end_date=end_date)
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(host='0.0.0.0', port=port)
@@ -1,39 +1,49 @@
 import os
 import sys
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 import pandasdmx as sdmx
-import time
 from dotenv import load_dotenv
 
 # --- CONFIGURATION ---
 EURO_COUNTRIES = {'DE': 'Germany', 'IT': 'Italy', 'FR': 'France'}
 EURO_TENORS = {'Up to 1Y': 'S', '1Y-2Y': 'Y12', '2Y-5Y': 'Y25', '5Y-10Y': 'Y5A', '10Y+': 'YA_'}
 EURO_FLOW_ID = 'CSEC'
+EURO_CACHE_FILE = 'euro_data.parquet'
 
 load_dotenv()
 US_BASE_URL = os.getenv("BASE_URL", "https://api.fiscaldata.treasury.gov/services/api/fiscal_service")
 US_AUCTION_ENDPOINT = "/v1/accounting/od/auctions_query"
-US_AUCTION_CACHE_FILE = 'auctions.pkl'
+US_FETCH_WORKERS = 16
+US_AUCTION_CACHE_FILE = 'auctions.parquet'
+US_QUARTERLY_CACHE_FILE = 'auctions_quarterly.parquet'
+US_MATURITY_BIN_EDGES = np.array([1, 30, 91, 365, 365 * 3, 365 * 10])
+US_PLOT_ORDER = ['< 1 Month','1-3 Months','3-12 Months','1-3 Years','3-10 Years','10+ Years','Other']
 
 # ==============================================================================
 # --- DATA FETCHING AND PROCESSING FUNCTIONS ---
 # ==============================================================================
 def get_and_process_euro_data(country_code):
     print(f"\n--- Fetching EURO data for {EURO_COUNTRIES[country_code]} ({country_code}) ---")
-    ecb = sdmx.Request('ECB')
-    country_data_frames = []
-    for tenor_name, tenor_code in EURO_TENORS.items():
+    def fetch_tenor(tenor_name, tenor_code):
         key = f"M.N.{country_code}.W0.S1311.S1.N.LI.F.F3.{tenor_code}._Z.EUR.EUR.M.V.N._T"
         print(f"Fetching tenor: {tenor_name}...")
-        try:
-            resp = ecb.data(EURO_FLOW_ID, key=key, params={'startPeriod': '2020'})
-            series = resp.to_pandas()
-            series.name = tenor_name
-            country_data_frames.append(series)
-        except Exception as e:
-            print(f"  -> Could not retrieve data for tenor '{tenor_name}'. Error: {e}")
-        time.sleep(0.5)
+        resp = sdmx.Request('ECB').data(EURO_FLOW_ID, key=key, params={'startPeriod': '2020'})
+        series = resp.to_pandas()
+        series.name = tenor_name
+        return series
+    country_data_frames = []
+    with ThreadPoolExecutor(max_workers=len(EURO_TENORS)) as executor:
+        futures = {tenor_name: executor.submit(fetch_tenor, tenor_name, tenor_code) for tenor_name, tenor_code in EURO_TENORS.items()}
+        for tenor_name, future in futures.items():
+            try:
+                country_data_frames.append(future.result())
+            except Exception as e:
+                print(f"  -> Could not retrieve data for tenor '{tenor_name}'. Error: {e}")
     
     if not country_data_frames: return None
     final_table = pd.concat(country_data_frames, axis=1)
@@ -50,23 +60,29 @@ def get_and_process_euro_data(country_code):
 def fetch_us_data(base_url, endpoint, api_filter=""):
     all_records = []
     print(f"🚀 Fetching live US data from {endpoint}{api_filter}...")
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=US_FETCH_WORKERS, pool_maxsize=US_FETCH_WORKERS, max_retries=Retry(total=3, backoff_factor=0.3)))
+    def fetch_page(url):
+        response = session.get(url, timeout=30)
+        response.raise_for_status()
+        return response.json()['data']
     try:
         page_number, page_size = 1, 100
         first_page_url = f"{base_url}{endpoint}{api_filter}&page[number]={page_number}&page[size]={page_size}"
-        response = requests.get(first_page_url, timeout=60)
+        response = session.get(first_page_url, timeout=60)
         response.raise_for_status()
         data = response.json()
         all_records.extend(data['data'])
         total_pages = data.get('meta', {}).get('total-pages', 1)
-        for page_num in range(2, total_pages + 1):
-            next_url = f"{base_url}{endpoint}{api_filter}&page[number]={page_num}&page[size]={page_size}"
-            response = requests.get(next_url, timeout=30)
-            response.raise_for_status()
-            all_records.extend(response.json()['data'])
-            time.sleep(0.1)
+        page_urls = [f"{base_url}{endpoint}{api_filter}&page[number]={page_num}&page[size]={page_size}" for page_num in range(2, total_pages + 1)]
+        with ThreadPoolExecutor(max_workers=US_FETCH_WORKERS) as executor:
+            for page_records in executor.map(fetch_page, page_urls):
+                all_records.extend(page_records)
     except requests.exceptions.RequestException as e:
         print(f"\n❌ CRITICAL: Failed to fetch US data from {endpoint}: {e}")
         return None
+    finally:
+        session.close()
     print(f"\n✅ US Fetch complete. Records: {len(all_records)}")
     return pd.DataFrame(all_records)
 
@@ -84,29 +100,39 @@ def update_us_cache(start_year=2000):
     auction_df['auction_date'] = pd.to_datetime(auction_df['auction_date'], errors='coerce')
     for col in ['total_accepted', 'offering_amt']:
         if col in auction_df.columns:
-            auction_df[col] = pd.to_numeric(auction_df[col], errors='coerce').fillna(0)
+            auction_df[col] = pd.to_numeric(auction_df[col], errors='coerce').fillna(0).astype('float32')
     auction_df['duration_days'] = (auction_df['maturity_date'] - auction_df['issue_date']).dt.days
-    def assign_maturity_bin(days):
-        if days <= 0: return 'Other'
-        if days < 30: return '< 1 Month'
-        if days < 91: return '1-3 Months'
-        if days < 365: return '3-12 Months'
-        if days < 365 * 3: return '1-3 Years'
-        if days < 365 * 10: return '3-10 Years'
-        return '10+ Years'
-    auction_df['maturity_bin'] = auction_df['duration_days'].apply(assign_maturity_bin)
+    bin_codes = np.searchsorted(US_MATURITY_BIN_EDGES, auction_df['duration_days'].fillna(0).to_numpy(), side='right').astype(np.int8) - 1
+    bin_codes[bin_codes < 0] = US_PLOT_ORDER.index('Other')
+    auction_df['maturity_bin'] = pd.Categorical.from_codes(bin_codes, dtype=pd.CategoricalDtype(categories=US_PLOT_ORDER, ordered=True))
+    auction_df['security_term'] = auction_df['security_term'].astype('category')
+    auction_df = auction_df.sort_values('auction_date', kind='stable').reset_index(drop=True)
     
-    auction_df.to_pickle(US_AUCTION_CACHE_FILE)
+    auction_df.to_parquet(US_AUCTION_CACHE_FILE, engine='pyarrow', compression='zstd')
     print(f"✅ US data cache updated and saved to {US_AUCTION_CACHE_FILE}")
+    
+    quarterly_nominal = auction_df.set_index('issue_date').groupby([pd.Grouper(freq='QE'), 'maturity_bin'], observed=False)['total_accepted'].sum().unstack(fill_value=0)
+    quarterly_nominal.columns = quarterly_nominal.columns.astype(str)
+    quarterly_nominal.to_parquet(US_QUARTERLY_CACHE_FILE, engine='pyarrow', compression='zstd')
+    print(f"✅ US quarterly summary saved to {US_QUARTERLY_CACHE_FILE}")
 
 def update_euro_cache():
     print("\n--- Starting EURO Data Update ---")
+    monthly_summaries = {}
     for code in EURO_COUNTRIES.keys():
         monthly_summary = get_and_process_euro_data(code)
         if monthly_summary is not None:
-            cache_file = f'euro_data_{code}.pkl'
-            monthly_summary.to_pickle(cache_file)
-            print(f"✅ Euro data cache for {code} updated and saved to {cache_file}")
+            monthly_summaries[code] = monthly_summary
+            print(f"✅ Euro data for {code} updated.")
+    if not monthly_summaries:
+        print("❌ EURO data fetch failed. Cache not updated.")
+        return
+    if os.path.exists(EURO_CACHE_FILE):
+        for code, previous_summary in pd.read_parquet(EURO_CACHE_FILE, engine='pyarrow').groupby('country'):
+            monthly_summaries.setdefault(code, previous_summary.drop(columns='country'))
+    euro_df = pd.concat([monthly_summary.assign(country=code) for code, monthly_summary in monthly_summaries.items()])
+    euro_df.to_parquet(EURO_CACHE_FILE, engine='pyarrow', compression='zstd')
+    print(f"✅ Euro data cache updated and saved to {EURO_CACHE_FILE}")
 
 # ==============================================================================
 # --- MAIN EXECUTION BLOCK ---